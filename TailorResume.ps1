@@ -19,6 +19,10 @@
     When set to $true, the script will delete the generated .tex file after successful PDF creation.
     Default is $false, which keeps the .tex file for future reference or editing.
 
+.PARAMETER NoCache
+    Always call Gemini AI instead of reusing a cached response from a previous run with the same
+    resume and job description.
+
 .EXAMPLE
     .\\TailorResume.ps1 -JobDescriptionPath \".\\JD.txt\"
 #>
@@ -37,7 +41,10 @@ param (
     [string]$GeminiApiKey,
     
     [Parameter(Mandatory=$false)]
-    [bool]$DeleteTEXFile = $false
+    [bool]$DeleteTEXFile = $false,
+
+    [Parameter(Mandatory=$false)]
+    [switch]$NoCache
 )
 
 # Check if Python is installed
@@ -48,7 +55,7 @@ function Test-PythonInstalled {
         return $true
     }
     catch {
-        Write-Host "Python is not installed or not in PATH. Please install Python 3.6 or higher." -ForegroundColor Red
+        Write-Host "Python is not installed or not in PATH. Please install Python 3.9 or higher." -ForegroundColor Red
         return $false
     }
 }
@@ -264,6 +271,9 @@ function Create-TailoredResume {
                 if ($PositionName) {
                     $pythonCmd += " --position `"$PositionName`""
                 }
+                if ($NoCache) {
+                    $pythonCmd += " --no-cache"
+                }
 
                 # Check if newFileName is defined
                 if (-not $newFileName) {
@@ -8,12 +8,23 @@ the LaTeX structure.
 """
 
 import argparse
+import asyncio
+import contextvars
 import sys
 import time
 import re
 import os
 import json
-from typing import Dict, Tuple, Optional, Any, Callable, TypeVar
+import hashlib
+import sqlite3
+import random
+import datetime
+import logging
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Optional, Any, Awaitable, Callable, TypeVar
+
+# The SDK builds response schemas with pydantic, which rejects typing.TypedDict before Python 3.12
+from typing_extensions import TypedDict
 
 # Check if the google.generativeai package is installed
 try:
@@ -24,6 +35,98 @@ except ImportError:
     sys.exit(1)
 
 
+# Set the DEBUG environment variable to log extra diagnostics such as raw responses and stack traces
+DEBUG = bool(os.environ.get("DEBUG"))
+
+logger = logging.getLogger(__name__)
+
+# Standing instructions given to every model as its system instruction. Context caches carry it too,
+# so it must not get in the way of the extraction request, which only wants a JSON object back
+SYSTEM_INSTRUCTION = (
+    "You are an expert ATS resume tailoring specialist. When asked to tailor the resume, analyze "
+    "the job description's hard and soft skills, responsibilities, terminology and qualifications, "
+    "find the matching experience in the LaTeX resume, and rewrite it to match the job while "
+    "keeping the LaTeX valid. Answer any other request, such as extracting details from the job "
+    "description, exactly in the format it asks for."
+)
+
+# Closing instruction for prompts that expect the raw LaTeX document back
+LATEX_OUTPUT_INSTRUCTION = (
+    "Return ONLY the modified LaTeX code with no explanations or comments outside the LaTeX document."
+)
+
+# On-disk copy of the available model names, refreshed at most once a day
+MODEL_LIST_CACHE_PATH = Path("~/.cache/tailor_gemini_models.json").expanduser()
+MODEL_LIST_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Requests-per-minute and tokens-per-minute quotas, by model name prefix (longest match wins)
+MODEL_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gemini-2.0-flash-lite": (4000, 4_000_000),
+    "gemini-2.0-flash": (2000, 4_000_000),
+    "gemini-2.0-pro": (1000, 4_000_000),
+    "gemini-1.5-flash": (1000, 4_000_000),
+    "gemini-1.5-pro": (360, 4_000_000),
+}
+
+# Quotas for models not listed in MODEL_LIMITS
+DEFAULT_MODEL_LIMITS = (60, 1_000_000)
+
+# Quota errors halve a model's limits at most once per window, never below this fraction of its
+# quotas; each later window without a quota error doubles them again
+THROTTLE_WINDOW_SECONDS = 60
+MIN_THROTTLE_FRACTION = 0.25
+
+# Maximum number of models raced concurrently by retry_with_models_async
+MODEL_RACE_CONCURRENCY = 3
+
+# How long the loaded model runs alone before fallback models join the race
+PRIMARY_HEAD_START_SECONDS = 30
+
+# How often to report progress while waiting for a model to respond
+HEARTBEAT_INTERVAL_SECONDS = 5
+
+# Retries on the same model after a quota error, before giving its slot to a fallback
+QUOTA_RETRY_ATTEMPTS = 4
+MAX_BACKOFF_SECONDS = 30
+
+# Approximate characters per token, used to estimate prompt sizes without an API call
+CHARS_PER_TOKEN = 4
+
+# Minimum cached-content sizes (in tokens) accepted by the explicit caching API
+MIN_CACHE_TOKENS_FLASH = 1024
+MIN_CACHE_TOKENS_PRO = 4096
+
+# Lifetime of the resume cache shared by a --jd-dir batch
+RESUME_CACHE_TTL_SECONDS = 1800
+
+# On-disk cache of successful Gemini responses; entries older than the TTL are ignored and pruned
+RESPONSE_CACHE_PATH = Path("~/.cache/tailor_gemini.db").expanduser()
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Fixed model versions end in a three-digit suffix, e.g. gemini-1.5-flash-002
+_MODEL_VERSION_RE = re.compile(r"-\d{3}$")
+
+# Section commands in LaTeX resumes: \section / \subsection titles, or environment names
+_SECTION_RE = re.compile(r'\\(?:section|subsection)\{([^}]+)\}|\\begin\{(\w+)\}')
+
+# Markdown code block the model sometimes wraps around LaTeX or JSON responses
+_FENCE_RE = re.compile(r"```(?:latex|json)?\s*([\s\S]*?)```")
+
+# Decoder used to pull the first JSON object out of free-form model responses
+_JSON_DECODER = json.JSONDecoder()
+
+# Individual company / position fields, for responses that aren't valid JSON
+_COMPANY_RE = re.compile(r"company\"?\s*:\s*\"([^\"]+)\"", re.IGNORECASE)
+_POSITION_RE = re.compile(r"position\"?\s*:\s*\"([^\"]+)\"", re.IGNORECASE)
+
+
+class TailoredBundle(TypedDict):
+    """JSON envelope returned by the bundled extraction + tailoring request."""
+    company: str
+    position: str
+    tailored_latex: str
+
+
 def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -34,31 +137,60 @@ def parse_arguments() -> argparse.Namespace:
         required=True, 
         help="Path to the resume template (.tex file)"
     )
-    parser.add_argument(
+    jd_group = parser.add_mutually_exclusive_group(required=True)
+    jd_group.add_argument(
         "--jd", 
-        required=True, 
         help="Path to the job description file"
     )
+    jd_group.add_argument(
+        "--jd-dir",
+        help="Directory of job description (.txt) files to tailor the resume for in one run"
+    )
     parser.add_argument(
         "--company", 
         required=False, 
-        help="Company name (will be extracted from job description if not provided)"
+        help="Company name (will be extracted from job description if not provided; not allowed with --jd-dir)"
     )
     parser.add_argument(
         "--position", 
         required=False, 
-        help="Position name (will be extracted from job description if not provided)"
+        help="Position name (will be extracted from job description if not provided; not allowed with --jd-dir)"
     )
     parser.add_argument(
         "--output", 
         required=True, 
-        help="Output file path for tailored resume"
+        help="Output file path for tailored resume (output directory when using --jd-dir)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=5,
+        help="Maximum number of job descriptions processed at once with --jd-dir (default: 5)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Gemini instead of reusing cached responses from previous runs"
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.jd_dir:
+        # Each job description names its own company and position
+        if args.company or args.position:
+            parser.error("--company and --position cannot be used with --jd-dir")
+        if Path(args.output).exists() and not Path(args.output).is_dir():
+            parser.error(f"--output must be a directory when using --jd-dir: {args.output}")
+    return args
 
 
 def setup_gemini_api(api_key: str) -> None:
-    """Initialize the Gemini API with the provided key."""
+    """
+    Initialize the Gemini API with the provided key.
+
+    The SDK's async client uses its default grpc_asyncio transport; forcing
+    transport="grpc" would give it a blocking channel that cannot be awaited.
+    """
     try:
         genai.configure(api_key=api_key)
         print("Gemini API configured successfully.")
@@ -67,6 +199,30 @@ def setup_gemini_api(api_key: str) -> None:
         sys.exit(1)
 
 
+def load_model_names() -> List[str]:
+    """
+    Return the names of all available Gemini models.
+
+    The list rarely changes, so it is read from MODEL_LIST_CACHE_PATH when that file
+    is less than MODEL_LIST_CACHE_TTL_SECONDS old, and only fetched with
+    genai.list_models() otherwise.
+    """
+    try:
+        if time.time() - MODEL_LIST_CACHE_PATH.stat().st_mtime < MODEL_LIST_CACHE_TTL_SECONDS:
+            return json.loads(MODEL_LIST_CACHE_PATH.read_bytes())
+    except (OSError, ValueError):
+        pass
+
+    print("Listing available Gemini models...")
+    model_names = [model.name for model in genai.list_models()]
+    try:
+        MODEL_LIST_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        MODEL_LIST_CACHE_PATH.write_bytes(json.dumps(model_names).encode('utf-8'))
+    except OSError as e:
+        print(f"Warning: Could not cache model list: {str(e)}")
+    return model_names
+
+
 def list_available_models() -> str:
     """
     List all available Gemini models and return the best available model for text generation.
@@ -75,15 +231,10 @@ def list_available_models() -> str:
         The model name to use for generation
     """
     try:
-        print("Listing available Gemini models:")
-        models = genai.list_models()
+        available_models = load_model_names()
         
-        # Print all available models for diagnostic purposes
-        available_models = []
-        for model in models:
-            model_name = model.name
-            print(f"- {model_name}")
-            available_models.append(model_name)
+        # Log all available models for diagnostic purposes
+        logger.debug("Available Gemini models: %s", ", ".join(available_models))
         
         # First, check for our preferred models in a specific order
         preferred_models = [
@@ -118,120 +269,514 @@ def list_available_models() -> str:
         print(f"Error listing models: {str(e)}")
         print("Attempting to use gemini-1.5-pro as fallback...")
         return "gemini-1.5-pro"
-def retry_with_models(func: Callable, model: Any, *args, **kwargs) -> Any:
+def is_retryable_error(error: Exception) -> bool:
+    """Return True for errors that another model may not hit (quota exhausted or model not found)."""
+    message = str(error)
+    return ("429 Resource has been exhausted" in message or
+            "quota" in message.lower() or
+            "404" in message or
+            "not found" in message.lower())
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Return True if the error indicates the model's quota is exhausted."""
+    return "429 Resource has been exhausted" in str(error) or "quota" in str(error).lower()
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
     """
-    Try to execute a function with a model, falling back to alternative models if quota exceeded.
+    Return the server-requested retry delay in seconds for a quota error, if any.
+
+    Checks the Retry-After header of REST responses and the RetryInfo detail
+    attached to gRPC ResourceExhausted errors.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers and headers.get("Retry-After"):
+        try:
+            return float(headers["Retry-After"])
+        except ValueError:
+            pass
+
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is None:
+            continue
+        if hasattr(retry_delay, "total_seconds"):
+            return retry_delay.total_seconds()
+        if hasattr(retry_delay, "seconds"):
+            return retry_delay.seconds + getattr(retry_delay, "nanos", 0) / 1e9
+    return None
+
+
+# Models to fall back to, in order of preference
+_RAW_FALLBACK_MODELS = [
+    # Latest pro models (highest quality text generation)
+    "gemini-2.0-pro-exp-02-05",
+    "gemini-2.0-pro-exp",
+    "gemini-1.5-pro-latest",
+    "gemini-1.5-pro",
+    "gemini-1.5-pro-002",
+    "gemini-1.5-pro-001",
+    
+    # Flash models (faster responses, may have better quota)
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-001",
+    "gemini-1.5-flash-latest",
+    "gemini-1.5-flash",
+    "gemini-1.5-flash-002",
+    "gemini-1.5-flash-001",
+    "gemini-1.5-flash-001-tuning",
+    
+    # Lite models (smaller, may have better quota availability)
+    "gemini-2.0-flash-lite",
+    "gemini-2.0-flash-lite-001",
+    "gemini-2.0-flash-lite-preview",
+    "gemini-2.0-flash-lite-preview-02-05",
+    
+    # Experimental models
+    "gemini-2.0-flash-exp",
+    "gemini-exp-1206",
+    "learnlm-1.5-pro-experimental",
+    
+    # Specialty models as last resort
+    "gemini-2.0-flash-thinking-exp",
+    "gemini-2.0-flash-thinking-exp-1219",
+    "gemini-2.0-flash-thinking-exp-01-21"
+]
+
+# Canonical fallback model names: "models/" prefix stripped, duplicates removed, order kept
+FALLBACK_MODELS = tuple(dict.fromkeys(name.removeprefix("models/") for name in _RAW_FALLBACK_MODELS))
+
+# GenerativeModel instances by model name, reused across fallbacks and requests
+_MODEL_CACHE: Dict[str, Any] = {}
+
+
+def get_model(model_name: str) -> Any:
+    """Return the GenerativeModel for a model name, creating it on first use."""
+    model = _MODEL_CACHE.get(model_name)
+    if model is None:
+        model = genai.GenerativeModel(model_name, system_instruction=SYSTEM_INSTRUCTION)
+        _MODEL_CACHE[model_name] = model
+    return model
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for one model's requests-per-minute and tokens-per-minute quotas.
+
+    Both buckets refill continuously; acquire() waits until one request and the
+    estimated number of input tokens are available. throttle() halves the quotas
+    after the server reports a quota error, so concurrent requests slow down
+    instead of all hitting the limit. The quotas recover once the errors stop.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.base_rpm = rpm
+        self.base_tpm = tpm
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        # Time of the latest quota error while throttled, and of the latest halving
+        self._throttled_at: Optional[float] = None
+        self._halved_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        # Double the throttled quotas back towards the real ones for every window without a quota error
+        if self._throttled_at is not None and now - self._throttled_at >= THROTTLE_WINDOW_SECONDS:
+            self.rpm = min(self.base_rpm, self.rpm * 2)
+            self.tpm = min(self.base_tpm, self.tpm * 2)
+            restored = self.rpm == self.base_rpm and self.tpm == self.base_tpm
+            self._throttled_at = None if restored else now
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until a request of the given (estimated) token count fits within the quotas."""
+        # A single request larger than the whole bucket would otherwise wait forever
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max((1 - self._requests) * 60 / self.rpm,
+                           (tokens - self._tokens) * 60 / self.tpm)
+                await asyncio.sleep(wait)
+
+    def throttle(self) -> None:
+        """Empty the request bucket after a quota error, halving the quotas once per window."""
+        now = time.monotonic()
+        self._throttled_at = now
+        self._refill()
+        self._requests = 0.0
+        # Concurrent requests and backoff retries hitting the same limit count as one quota error
+        if self._halved_at is not None and now - self._halved_at < THROTTLE_WINDOW_SECONDS:
+            return
+        self._halved_at = now
+        self.rpm = max(1, int(self.base_rpm * MIN_THROTTLE_FRACTION), self.rpm // 2)
+        self.tpm = max(1, int(self.base_tpm * MIN_THROTTLE_FRACTION), self.tpm // 2)
+        self._tokens = min(self._tokens, self.tpm)
+
+
+# RateLimiter per unversioned model name, shared by every request to that model
+_RATE_LIMITERS: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(model: Any) -> RateLimiter:
+    """
+    Return the RateLimiter for a model, creating it from MODEL_LIMITS on first use.
+
+    Limiters are keyed on the model name without its version suffix, so a
+    LazyContextCache, the cache-backed model it resolves to (e.g.
+    gemini-1.5-flash-002) and the plain model all share one set of quotas.
+    """
+    model_name = getattr(model, "model_name", str(model)).removeprefix("models/")
+    model_name = _MODEL_VERSION_RE.sub("", model_name)
+    limiter = _RATE_LIMITERS.get(model_name)
+    if limiter is None:
+        prefixes = [prefix for prefix in MODEL_LIMITS if model_name.startswith(prefix)]
+        rpm, tpm = MODEL_LIMITS[max(prefixes, key=len)] if prefixes else DEFAULT_MODEL_LIMITS
+        limiter = RateLimiter(rpm, tpm)
+        _RATE_LIMITERS[model_name] = limiter
+    return limiter
+
+
+async def acquire_rate_limit(model: Any, prompt: str) -> None:
+    """Wait for the model's rate limiter, estimating the prompt's tokens locally."""
+    await get_rate_limiter(model).acquire(len(prompt) // CHARS_PER_TOKEN)
+
+
+# Event of the race the current request belongs to; stream_response_text sets it
+# when the first chunk arrives, so fallbacks aren't started while a model streams
+_FIRST_CHUNK_EVENT: contextvars.ContextVar[Optional[asyncio.Event]] = contextvars.ContextVar(
+    "first_chunk_event", default=None)
+
+# Name of the job description being tailored in --jd-dir mode, used to label progress
+_JOB_LABEL: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("job_label", default=None)
+
+
+async def retry_with_models_async(func: Callable[..., Awaitable[Any]], model: Any, *args, **kwargs) -> Any:
+    """
+    Race a coroutine function across the loaded model and its fallbacks.
+
+    The loaded model runs alone first, so a request is normally sent (and billed)
+    once. Fallback models only join once it fails, or when no response chunk has
+    arrived within PRIMARY_HEAD_START_SECONDS (a slow first token, not a long
+    streamed document); they then run concurrently with it (at most
+    MODEL_RACE_CONCURRENCY at a time). The first successful result is returned and
+    the remaining requests are cancelled. Quota errors are retried on the same model
+    with exponential backoff and jitter (honouring any server-provided retry delay)
+    up to QUOTA_RETRY_ATTEMPTS times. When a model still fails with a quota or
+    model-not-found error, the next fallback model takes its slot; any other error
+    stops further fallbacks from being started.
     
     Args:
-        func: The function to execute with the model
+        func: The coroutine function to execute with the model
         model: The primary model to try first
         *args, **kwargs: Additional arguments to pass to the function
         
     Returns:
-        The result of the function execution
+        The result of the first successful function execution
         
     Raises:
         Exception: If all models fail
     """
-    # List of models to try in order of preference
-    # List of models to try in order of preference
-    FALLBACK_MODELS = [
-        # Latest pro models (highest quality text generation)
-        "gemini-2.0-pro-exp-02-05",
-        "gemini-2.0-pro-exp",
-        "gemini-1.5-pro-latest",
-        "gemini-1.5-pro",
-        "gemini-1.5-pro-002",
-        "gemini-1.5-pro-001",
-        
-        # Flash models (faster responses, may have better quota)
-        "gemini-2.0-flash",
-        "gemini-2.0-flash-001",
-        "gemini-1.5-flash-latest",
-        "gemini-1.5-flash",
-        "gemini-1.5-flash-002",
-        "gemini-1.5-flash-001",
-        "gemini-1.5-flash-001-tuning",
-        
-        # Lite models (smaller, may have better quota availability)
-        "gemini-2.0-flash-lite",
-        "gemini-2.0-flash-lite-001",
-        "gemini-2.0-flash-lite-preview",
-        "gemini-2.0-flash-lite-preview-02-05",
-        
-        # Experimental models
-        "gemini-2.0-flash-exp",
-        "gemini-exp-1206",
-        "learnlm-1.5-pro-experimental",
-        
-        # Specialty models as last resort
-        "gemini-2.0-flash-thinking-exp",
-        "gemini-2.0-flash-thinking-exp-1219",
-        "gemini-2.0-flash-thinking-exp-01-21"
-    ]
+    # The loaded model goes first, followed by every other fallback model
+    primary_name = getattr(model, 'model_name', '').removeprefix("models/")
+    candidates: List[Any] = [model]
+    candidates.extend(name for name in FALLBACK_MODELS if name != primary_name)
+
+    semaphore = asyncio.Semaphore(MODEL_RACE_CONCURRENCY)
+    launch_fallbacks = asyncio.Event()
+    stop_launching = asyncio.Event()
+    first_chunk = asyncio.Event()
+    skipped = object()
+
+    async def _attempt(candidate: Any) -> Any:
+        # Each attempt runs in its own task, so this only affects its own requests
+        _FIRST_CHUNK_EVENT.set(first_chunk)
+        if candidate is not model:
+            # Give the loaded model a head start so it usually answers on its own
+            try:
+                await asyncio.wait_for(launch_fallbacks.wait(), PRIMARY_HEAD_START_SECONDS)
+            except asyncio.TimeoutError:
+                # It is already streaming its answer; only step in if it fails
+                if first_chunk.is_set():
+                    await launch_fallbacks.wait()
+        async with semaphore:
+            # Don't start new fallbacks once a request succeeded or hit a non-retryable error
+            if stop_launching.is_set():
+                return skipped
+            if isinstance(candidate, str):
+                print(f"Attempting to use {candidate} model...")
+                candidate = get_model(candidate)
+            model_name = getattr(candidate, 'model_name', 'unknown')
+            attempt = 0
+            while True:
+                try:
+                    # Don't modify the original args, just pass the model as the first argument
+                    result = await func(candidate, *args, **kwargs)
+                    break
+                except Exception as e:
+                    print(f"Error with model {model_name}: {str(e)}")
+                    if is_quota_error(e):
+                        # Slow down every request to this model, not just this one
+                        get_rate_limiter(candidate).throttle()
+                    if is_quota_error(e) and attempt < QUOTA_RETRY_ATTEMPTS:
+                        retry_after = get_retry_after(e)
+                        # Switch models rather than wait longer than our own backoff ceiling
+                        if retry_after is None or retry_after <= MAX_BACKOFF_SECONDS:
+                            delay = retry_after
+                            if delay is None:
+                                delay = min(2 ** attempt + random.random(), MAX_BACKOFF_SECONDS)
+                            attempt += 1
+                            print(f"Retrying {model_name} in {delay:.1f} seconds "
+                                  f"(attempt {attempt}/{QUOTA_RETRY_ATTEMPTS})...")
+                            await asyncio.sleep(delay)
+                            continue
+                    if not is_retryable_error(e):
+                        stop_launching.set()
+                    launch_fallbacks.set()
+                    raise
+            stop_launching.set()
+            return result
+
     last_exception = None
-    
-    # Track which models we've already tried to avoid duplicates
-    tried_models = set()
-    
-    # First try with the loaded model
+    start_time = time.time()
+    pending = {asyncio.ensure_future(_attempt(candidate)) for candidate in candidates}
     try:
-        if hasattr(model, 'model_name'):
-            model_name = model.model_name
-            tried_models.add(model_name)
-            # Also add the version without prefix if it has one
-            if model_name.startswith("models/"):
-                tried_models.add(model_name.split('/')[-1])
-            # And add the version with prefix if it doesn't have one
-            else:
-                tried_models.add(f"models/{model_name}")
-        
-        return func(model, *args, **kwargs)
-    except Exception as e:
-        last_exception = e
-        # Only continue to fallbacks if it's a quota error
-        if "429 Resource has been exhausted" not in str(e) and "quota" not in str(e).lower():
-            raise e
-        
-        model_name = getattr(model, 'model_name', 'unknown')
-        print(f"Error with loaded model ({model_name}): {str(e)}")
-        print(f"Trying fallback models...")
-    
-    # Try each fallback model in sequence
-    for model_name in FALLBACK_MODELS:
-        # Skip if we've already tried this model
-        if model_name in tried_models or f"models/{model_name}" in tried_models:
-            continue
-            
-        try:
-            print(f"Attempting to use {model_name} model...")
-            # Add both versions to tried_models to avoid duplicates
-            tried_models.add(model_name)
-            tried_models.add(f"models/{model_name}")
-            
-            fallback_model = genai.GenerativeModel(model_name)
-            # Don't modify the original args, just pass the model as the first argument
-            return func(fallback_model, *args, **kwargs)
-        except Exception as e:
-            last_exception = e
-            print(f"Error with fallback model {model_name}: {str(e)}")
-            # Continue to the next model for quota errors or model not found errors
-            if ("429 Resource has been exhausted" not in str(e) and 
-                "quota" not in str(e).lower() and 
-                "404" not in str(e) and 
-                "not found" not in str(e).lower()):
-                break
-    
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=HEARTBEAT_INTERVAL_SECONDS,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # Nothing has arrived yet; let the user know we're still working
+                if not first_chunk.is_set():
+                    job_label = _JOB_LABEL.get()
+                    prefix = f"[{job_label}] " if job_label else ""
+                    print(f"{prefix}Still waiting for Gemini AI... "
+                          f"({time.time() - start_time:.0f} seconds elapsed)")
+                continue
+            for task in done:
+                if task.exception() is not None:
+                    last_exception = task.exception()
+                elif task.result() is not skipped:
+                    return task.result()
+    finally:
+        # Cancel the requests that lost the race
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
     # If we get here, all models failed
     print("All models have failed. Raising the last exception.")
     raise last_exception
 
 
+# Event loop shared by every Gemini request, see get_event_loop
+_EVENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the event loop used for all Gemini requests, creating it on first use.
+
+    The SDK's async gRPC channel is bound to the loop it was created on, so running
+    every request on one loop lets that channel (and its connection) be reused.
+    """
+    global _EVENT_LOOP
+    if _EVENT_LOOP is None or _EVENT_LOOP.is_closed():
+        _EVENT_LOOP = asyncio.new_event_loop()
+    return _EVENT_LOOP
+
+
+# Document labels held by each context cache, keyed by cache name
+_CONTEXT_CACHE_DOCUMENTS: Dict[str, Tuple[str, ...]] = {}
+
+
+def cached_documents(model: Any) -> Tuple[str, ...]:
+    """Return the labels of the documents held by the model's cached context, if any."""
+    cache_name = getattr(model, "cached_content", None)
+    if cache_name is None:
+        return ()
+    return _CONTEXT_CACHE_DOCUMENTS.get(cache_name, ("Job Description", "Current Resume"))
+
+
+# Model versions whose context cache creation failed, so it isn't retried for every job
+_UNCACHEABLE_MODELS: Set[str] = set()
+
+
+def context_cache_model_name(model_name: str) -> Optional[str]:
+    """
+    Return the fixed model version to create a context cache for, or None if there is none.
+
+    The caching API only accepts fixed versions such as gemini-1.5-flash-002, so an
+    alias like gemini-1.5-flash is mapped to its newest available version.
+    """
+    model_name = model_name.removeprefix("models/")
+    if _MODEL_VERSION_RE.search(model_name):
+        return model_name
+    try:
+        available_models = load_model_names()
+    except Exception:
+        return None
+    versions = [name.removeprefix("models/") for name in available_models
+                if re.fullmatch(re.escape(f"models/{model_name}") + r"-\d{3}", name)]
+    return max(versions, default=None)
+
+
+def build_context_cache(model_name: str, jd_content: Optional[str], resume_content: str,
+                        ttl_seconds: int = 600) -> Optional[Any]:
+    """
+    Upload the job description and resume once as a Gemini context cache.
+
+    Subsequent requests made with a model built from the cache only need to send
+    the per-call instructions, instead of re-sending the cached documents every time.
+
+    Args:
+        model_name: The model the cache is created for
+        jd_content: The job description text, or None to cache only the resume
+        resume_content: The original LaTeX resume content
+        ttl_seconds: How long the cache should live on the server
+
+    Returns:
+        The CachedContent object, or None if the documents are too short to be
+        cached or the cache could not be created
+    """
+    min_tokens = MIN_CACHE_TOKENS_PRO if "pro" in model_name else MIN_CACHE_TOKENS_FLASH
+    documents = {"Current Resume": resume_content}
+    if jd_content is not None:
+        documents = {"Job Description": jd_content, **documents}
+
+    estimated_tokens = sum(len(content) for content in documents.values()) // CHARS_PER_TOKEN
+    if estimated_tokens < min_tokens:
+        print(f"Skipping context cache: ~{estimated_tokens} tokens is below the {min_tokens} token minimum.")
+        return None
+
+    cache_model_name = context_cache_model_name(model_name)
+    if cache_model_name is None:
+        print(f"Skipping context cache: no fixed version of {model_name} is available for caching.")
+        return None
+    if cache_model_name in _UNCACHEABLE_MODELS:
+        return None
+
+    try:
+        cache = genai.caching.CachedContent.create(
+            model=f"models/{cache_model_name}",
+            display_name="tailor-resume-context",
+            system_instruction=SYSTEM_INSTRUCTION,
+            contents=[format_document_block(label, content) for label, content in documents.items()],
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+        _CONTEXT_CACHE_DOCUMENTS[cache.name] = tuple(documents)
+        print(f"Created context cache for {' and '.join(documents).lower()} (~{estimated_tokens} tokens).")
+        return cache
+    except Exception as e:
+        print(f"Warning: Could not create context cache, sending full prompts instead: {str(e)}")
+        _UNCACHEABLE_MODELS.add(cache_model_name)
+        return None
+
+
+def delete_context_cache(cache: Any) -> None:
+    """Delete a context cache created by build_context_cache."""
+    _CONTEXT_CACHE_DOCUMENTS.pop(cache.name, None)
+    try:
+        cache.delete()
+        print("Context cache deleted.")
+    except Exception as e:
+        print(f"Warning: Failed to delete context cache: {str(e)}")
+
+
+# Connection to the on-disk response cache, see open_response_cache
+_RESPONSE_CACHE: Optional[sqlite3.Connection] = None
+
+
+def open_response_cache(cache_path: Path = RESPONSE_CACHE_PATH) -> None:
+    """
+    Open (creating if needed) the SQLite cache of Gemini responses.
+
+    Responses are keyed by model and prompt, so re-running with the same template
+    and job description skips the network entirely. Responses older than
+    RESPONSE_CACHE_TTL_SECONDS are pruned. The cache stays disabled if the database
+    cannot be opened.
+    """
+    global _RESPONSE_CACHE
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(cache_path)
+        # WAL lets concurrent runs read while another one writes
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL)"
+        )
+        connection.execute("DELETE FROM responses WHERE created < ?",
+                           (time.time() - RESPONSE_CACHE_TTL_SECONDS,))
+        connection.commit()
+        _RESPONSE_CACHE = connection
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: Could not open response cache {cache_path}: {str(e)}")
+
+
+def response_cache_key(model: Any, prompt: str) -> str:
+    """
+    Build the response cache key for a request.
+
+    The prompt should embed every document, even if the request is then sent to a
+    cache-backed model, so the key is known before any context cache is created.
+    """
+    digest = hashlib.sha256()
+    for part in (getattr(model, "model_name", ""), SYSTEM_INSTRUCTION, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def load_cached_response(key: str) -> Optional[str]:
+    """Return the cached response text for a key, or None on a miss or an expired entry."""
+    if _RESPONSE_CACHE is None:
+        return None
+    try:
+        row = _RESPONSE_CACHE.execute(
+            "SELECT response FROM responses WHERE key = ? AND created >= ?",
+            (key, time.time() - RESPONSE_CACHE_TTL_SECONDS),
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Warning: Response cache lookup failed: {str(e)}")
+        return None
+    if row is None:
+        return None
+    print("Using cached Gemini response.")
+    return row[0]
+
+
+def store_cached_response(key: str, model: Any, response_text: str) -> None:
+    """Store a successful response text in the response cache."""
+    if _RESPONSE_CACHE is None:
+        return
+    try:
+        _RESPONSE_CACHE.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, created) VALUES (?, ?, ?, ?)",
+            (key, getattr(model, "model_name", ""), response_text, time.time()),
+        )
+        _RESPONSE_CACHE.commit()
+    except sqlite3.Error as e:
+        print(f"Warning: Could not store response in cache: {str(e)}")
+
+
 def read_file(file_path: str) -> str:
     """Read and return the content of a file."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        # Read the whole file at once and decode in a single step
+        return Path(file_path).read_bytes().decode('utf-8')
     except Exception as e:
         print(f"Error reading file {file_path}: {str(e)}")
         sys.exit(1)
@@ -242,37 +787,174 @@ def identify_latex_sections(content: str) -> Dict[str, Tuple[int, int]]:
     Identify the main sections in the LaTeX resume and their positions.
     Returns a dictionary mapping section names to (start, end) positions.
     """
-    # Common section commands in LaTeX resumes
-    section_patterns = [
-        r'\\section{([^}]+)}',
-        r'\\subsection{([^}]+)}',
-        r'\\begin{(\w+)}',  # For environment-based sections
-    ]
-    
-    sections = {}
-    last_section = None
-    last_pos = 0
+    # A single pass finds sections, subsections and environments in document order
+    positions = [(match.start(), match.group(1) or match.group(2))
+                 for match in _SECTION_RE.finditer(content)]
     
-    for pattern in section_patterns:
-        for match in re.finditer(pattern, content):
-            section_name = match.group(1)
-            start_pos = match.start()
-            
-            if last_section and start_pos > last_pos:
-                sections[last_section] = (last_pos, start_pos)
-            
-            last_section = section_name
-            last_pos = start_pos
-    
-    # Add the last section to end of document
-    if last_section:
-        sections[last_section] = (last_pos, len(content))
-    
-    return sections
+    # Each section runs until the next one starts; the last one runs to the end of the document
+    ends = [start for start, _ in positions[1:]] + [len(content)]
+    return {name: (start, end) for (start, name), end in zip(positions, ends)}
+
+
+def format_document_block(label: str, content: Optional[str]) -> str:
+    """
+    Format a labelled document for inclusion in a prompt.
+
+    When content is None the document is expected to live in the model's cached
+    context, so only a reference to it is emitted.
+    """
+    if content is None:
+        return f"{label}: see the \"{label}\" document in the cached context."
+    return f"{label}:\n```\n{content}\n```"
+
+
+def build_tailoring_prompt(resume_content: Optional[str], jd_content: Optional[str], company: str,
+                           position: str, output_instruction: str = LATEX_OUTPUT_INSTRUCTION) -> str:
+    """
+    Build the resume tailoring prompt shared by the plain and bundled generation paths.
+
+    Args:
+        resume_content: The original LaTeX resume content, or None if it is in the context cache
+        jd_content: The job description text, or None if it is in the context cache
+        company: The company name
+        position: The position being applied for
+        output_instruction: The closing instruction describing the expected response format
+
+    Returns:
+        str: The complete prompt text
+    """
+    jd_block = format_document_block("Job Description", jd_content)
+    resume_block = format_document_block("Current Resume", resume_content)
+
+    # The analysis steps live in SYSTEM_INSTRUCTION; the prompt only carries the per-call constraints
+    return f"""Tailor the current LaTeX resume for the {position} role at {company}.
+
+{jd_block}
+
+{resume_block}
+
+Rules:
+1. Summary: use the exact title "{position}", the 3-4 most important job description skills, and the job description's wording.
+2. Skills: list job description keywords first, using their exact phrasing; add missing ones only if the resume supports them.
+3. Experience: rewrite bullets with job description terminology, strong action verbs and quantified results; every bullet gets at least one keyword.
+4. Education/certifications: emphasise those matching the job requirements.
+5. Keep the exact LaTeX structure, commands and environments; add or remove none.
+6. Escape LaTeX special characters (%, $, #, &).
+7. Keep changes natural, not obviously written for one job.
+
+{output_instruction}
+"""
+
+
+def strip_code_fences(content: str) -> str:
+    """Remove markdown code block markers the model sometimes wraps around LaTeX."""
+    start = content.find("```")
+    if start < 0:
+        return content
+
+    # Extract content between the first pair of code block markers
+    match = _FENCE_RE.search(content, start)
+    if match:
+        return match.group(1).strip()
+
+    # A lone marker (e.g. a truncated response): keep the document after an opening fence,
+    # or before a closing one
+    end = start + 3
+    if content.startswith("latex", end):
+        end += len("latex")
+    return content[end:].strip() or content[:start].strip()
+
+
+async def stream_response_text(model: Any, prompt: str, **kwargs) -> Tuple[str, bool]:
+    """
+    Stream a Gemini response and return its full text.
+
+    Streaming lets the first chunk arrive while the rest of the document is still
+    being generated, so progress can be reported instead of waiting silently. The
+    first chunk also tells retry_with_models_async that the model is answering, so
+    it does not start fallback models for a long but healthy response.
+
+    Args:
+        model: The Gemini AI model to use
+        prompt: The prompt text
+        **kwargs: Additional arguments for generate_content_async (e.g. generation_config)
+
+    Returns:
+        A tuple of (text, complete): the concatenated text of all streamed chunks, and
+        whether the response finished normally rather than being cut short (e.g. by
+        MAX_TOKENS or SAFETY), in which case it must not be cached
+    """
+    await acquire_rate_limit(model, prompt)
+    start_time = time.time()
+    response = await model.generate_content_async(prompt, stream=True, **kwargs)
+
+    chunks = []
+    finish_reason = None
+    async for chunk in response:
+        candidates = getattr(chunk, "candidates", None)
+        if candidates and candidates[0].finish_reason:
+            finish_reason = candidates[0].finish_reason
+        # The final chunk may only carry the finish reason
+        if not chunk.parts:
+            continue
+        if not chunks:
+            print(f"First response chunk received after {time.time() - start_time:.2f} seconds, streaming the rest...")
+            first_chunk = _FIRST_CHUNK_EVENT.get()
+            if first_chunk is not None:
+                first_chunk.set()
+        chunks.append(chunk.text)
+
+    elapsed_time = time.time() - start_time
+    print(f"Received response from Gemini AI in {elapsed_time:.2f} seconds.")
+
+    finish_reason_name = getattr(finish_reason, "name", finish_reason)
+    complete = finish_reason_name == "STOP"
+    if not complete:
+        print(f"Warning: Gemini response ended early (finish reason: {finish_reason_name}); "
+              "it will not be cached.")
+    return "".join(chunks), complete
 
 
-def generate_tailored_content(model: Any, resume_content: str, jd_content: str, 
-                            company: str, position: str) -> str:
+async def request_tailoring(model: Any, resume_content: str, jd_content: str, company: str,
+                            position: str, output_instruction: str = LATEX_OUTPUT_INSTRUCTION,
+                            request_name: str = "request", **kwargs) -> Tuple[str, str, bool]:
+    """
+    Send a tailoring prompt to Gemini AI, unless its response is already cached.
+
+    The response cache key covers the prompt with every document embedded. On a miss
+    the model is resolved, and whichever documents its context cache already holds
+    are left out of the prompt that is actually sent.
+
+    Args:
+        model: The Gemini AI model to use
+        resume_content, jd_content, company, position, output_instruction: The
+            build_tailoring_prompt arguments
+        request_name: Describes the request in the progress message
+        **kwargs: Additional arguments for generate_content_async (e.g. generation_config)
+
+    Returns:
+        A tuple of (cache_key, response_text, complete), where complete is False if
+        the response was cut short and must not be cached
+    """
+    prompt = build_tailoring_prompt(resume_content, jd_content, company, position, output_instruction)
+    cache_key = response_cache_key(model, prompt)
+    response_text = load_cached_response(cache_key)
+    if response_text is not None:
+        return cache_key, response_text, True
+
+    model = await resolve_model(model)
+    cached = cached_documents(model)
+    if cached:
+        prompt = build_tailoring_prompt(None if "Current Resume" in cached else resume_content,
+                                        None if "Job Description" in cached else jd_content,
+                                        company, position, output_instruction)
+    print(f"Sending {request_name} to Gemini AI... (this may take a minute)")
+    response_text, complete = await stream_response_text(model, prompt, **kwargs)
+    return cache_key, response_text, complete
+
+
+async def generate_tailored_content(model: Any, resume_content: str, jd_content: str, 
+                                    company: str, position: str) -> str:
     """
     Use Gemini AI to tailor the resume content based on the job description.
     
@@ -286,115 +968,98 @@ def generate_tailored_content(model: Any, resume_content: str, jd_content: str,
     Returns:
         str: The tailored resume content, or the original content if tailoring fails
     """
-    # Define the actual content generation function to be used with retry_with_models
-    def _generate_content(model: Any, resume_content: str, jd_content: str, 
-                        company: str, position: str) -> str:
-        try:
-            print("Sending request to Gemini AI... (this may take a minute)")
-            start_time = time.time()
-
-            # Create the prompt using the function parameters
-            content_prompt = f"""
-            You are an expert ATS-optimized resume tailoring specialist who helps job seekers optimize their resumes to match specific job descriptions. I need you to tailor a LaTeX resume for a {position} position at {company}.
-
-            ## STEP 1: ANALYZE THE JOB DESCRIPTION
-            First, carefully analyze the job description below and extract:
-            1. Essential hard skills and technical requirements (at least 5-8)
-            2. Essential soft skills (at least 3-5)
-            3. Key responsibilities of the role
-            4. Industry-specific terminology and buzzwords
-            5. Required years of experience or qualifications
-            6. Company values or culture indicators
-
-            Job Description:
-            ```
-            {jd_content}
-            ```
-
-            ## STEP 2: ANALYZE THE RESUME
-            Now, analyze the current LaTeX resume and identify:
-            1. Which required skills from the job description are already present
-            2. Which relevant experiences could be reframed to better match the job requirements
-            3. Which achievements could be quantified or enhanced to demonstrate required competencies
-
-            Current Resume:
-            ```
-            {resume_content}
-            ```
-
-            ## STEP 3: APPLY STRATEGIC TAILORING
-            Now, tailor the resume using these specific strategies:
-
-            1. SUMMARY/OBJECTIVE SECTION:
-            - Include the exact job title ({position})
-            - Incorporate 3-4 of the most important skills from the job description
-            - Mirror the language used in the company's job description
-            - Briefly highlight relevant experience that matches the job requirements
-
-            2. SKILLS SECTION:
-            - Prioritize skills mentioned in the job description
-            - Use exact keywords/phrases from the job description
-            - Organize skills to highlight those most relevant to the position first
-            - Add any missing relevant skills from the job description that you genuinely possess
-
-            3. WORK EXPERIENCE SECTION:
-            - Rewrite bullet points to incorporate key requirements and terminology from the job description
-            - Begin each bullet with strong action verbs aligned with the job requirements
-            - Quantify achievements with specific metrics, percentages, and outcomes where possible
-            - Focus on accomplishments that demonstrate the skills needed for the {position} role
-            - Emphasize projects/tasks that align with the primary responsibilities in the job description
-
-            4. EDUCATION & CERTIFICATIONS:
-            - Emphasize education/certifications that align with the job requirements
-            - Include relevant coursework or projects if they align with the job requirements
-
-            ## CRITICAL REQUIREMENTS:
-            - Maintain the EXACT same LaTeX structure and formatting
-            - Preserve all LaTeX commands and environments
-            - Ensure special LaTeX characters (%, $, #, &, etc.) are properly escaped
-            - Do not add or remove any LaTeX environments or major structural elements
-            - Ensure each bullet point includes at least one keyword from the job description
-            - Match terminology exactly (e.g., if they say "project management", use "project management" not "managing projects")
-            - Make tailoring subtle and natural - it should not appear obviously modified for one specific job
-
-            Return ONLY the modified LaTeX code with no explanations or comments outside the LaTeX document.
-            """
-
-            response = model.generate_content(content_prompt)
-
-            elapsed_time = time.time() - start_time
-            print(f"Received response from Gemini AI in {elapsed_time:.2f} seconds.")
-
-            # Extract the tailored content from the response
-            tailored_content = response.text
-
-            # Clean up the response if it includes markdown code blocks
-            # Clean up the response if it includes markdown code blocks
-            if "```" in tailored_content:
-                # Extract content between the first and last code block markers
-                match = re.search(r"```(?:latex)?\s*([\s\S]*?)```", tailored_content)
-                if match:
-                    tailored_content = match.group(1).strip()
-                else:
-                    # If regex matching fails, manually remove code block markers
-                    tailored_content = tailored_content.replace("```latex", "").replace("```", "").strip()
-            return tailored_content
-        except Exception as e:
-            if "429 Resource has been exhausted" in str(e) or "quota" in str(e).lower():
-                # Let this be caught by the retry mechanism
-                raise e
-            else:
-                print(f"Error generating tailored content: {str(e)}")
-                return resume_content
+    # Define the actual content generation function to be used with retry_with_models_async
+    async def _generate_content(model: Any, resume_content: str, jd_content: str, 
+                                company: str, position: str) -> str:
+        cache_key, response_text, complete = await request_tailoring(
+            model, resume_content, jd_content, company, position
+        )
+
+        # Extract the tailored content from the response, dropping any markdown code blocks
+        tailored_content = strip_code_fences(response_text)
+        if tailored_content and complete:
+            store_cached_response(cache_key, model, response_text)
+        return tailored_content
     
     try:
-        return retry_with_models(_generate_content, model, resume_content, jd_content, company, position)
+        return await retry_with_models_async(_generate_content, model, resume_content, jd_content, company, position)
     except Exception as e:
         print(f"Error generating tailored content after trying all models: {str(e)}")
         print("Returning original content as fallback.")
         return resume_content
 
-def extract_company_and_position(model: Any, jd_content: str) -> Tuple[str, str]:
+async def generate_tailored_bundle(model: Any, resume_content: str, jd_content: str,
+                                   company_hint: Optional[str] = None,
+                                   position_hint: Optional[str] = None) -> Optional[Tuple[str, str, str]]:
+    """
+    Extract company/position and tailor the resume in a single Gemini request.
+
+    The model is asked for a JSON envelope matching TailoredBundle, so the job
+    description and resume are only sent (and tokenized) once per run.
+
+    Args:
+        model: The Gemini AI model to use
+        resume_content: The original LaTeX resume content
+        jd_content: The job description text
+        company_hint: Company name supplied by the user, or None to extract it
+        position_hint: Position name supplied by the user, or None to extract it
+
+    Returns:
+        A tuple of (company, position, tailored_content), or None if the bundled
+        request fails and the caller should fall back to separate requests
+    """
+    company_ref = company_hint or "the company named in the job description"
+    position_ref = position_hint or "the position described in the job description"
+
+    company_rule = (f'Set "company" to exactly "{company_hint}".' if company_hint
+                    else 'Set "company" to the company name extracted from the job description.')
+    position_rule = (f'Set "position" to exactly "{position_hint}".' if position_hint
+                     else 'Set "position" to the position title extracted from the job description.')
+
+    output_instruction = (
+        'Return ONLY a JSON object with the fields "company", "position" and "tailored_latex". '
+        f'{company_rule} {position_rule} '
+        'Set "tailored_latex" to the complete modified LaTeX document, with no explanations or comments outside it.'
+    )
+
+    generation_config = genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=TailoredBundle,
+    )
+
+    async def _generate_bundle(model: Any, resume_content: str, jd_content: str) -> Tuple[str, str, str]:
+        cache_key, response_text, complete = await request_tailoring(
+            model, resume_content, jd_content, company_ref, position_ref, output_instruction,
+            request_name="bundled extraction and tailoring request", generation_config=generation_config
+        )
+
+        bundle = json.loads(response_text)
+        company = company_hint or bundle.get("company") or "Unknown Company"
+        position = position_hint or bundle.get("position") or "Unknown Position"
+        tailored_content = strip_code_fences(bundle.get("tailored_latex") or "")
+        if not tailored_content:
+            raise ValueError("Bundled response did not contain tailored LaTeX")
+
+        if complete:
+            store_cached_response(cache_key, model, response_text)
+        return company, position, tailored_content
+
+    try:
+        company, position, tailored_content = await retry_with_models_async(
+            _generate_bundle, model, resume_content, jd_content
+        )
+    except Exception as e:
+        print(f"Error generating bundled response after trying all models: {str(e)}")
+        return None
+
+    if company_hint is None or position_hint is None:
+        print(f"Extracted Company: {company}")
+        print(f"Extracted Position: {position}")
+
+    return company, position, tailored_content
+
+
+async def extract_company_and_position(model: Any, jd_content: str) -> Tuple[str, str]:
     """
     Extract company name and position from job description using Gemini AI.
     
@@ -406,15 +1071,13 @@ def extract_company_and_position(model: Any, jd_content: str) -> Tuple[str, str]
         A tuple containing (company_name, position_name)
         Returns ("Unknown Company", "Unknown Position") if extraction fails
     """
-    prompt = f"""
+    def _build_prompt(jd_content: Optional[str]) -> str:
+        return f"""
     Please extract the company name and position title from the following job description.
     Return ONLY a JSON object with two fields: "company" and "position".
     Do not include any explanation, just the JSON object.
     
-    Job Description:
-    ```
-    {jd_content}
-    ```
+    {format_document_block("Job Description", jd_content)}
     
     Example response format:
     {{
@@ -423,125 +1086,344 @@ def extract_company_and_position(model: Any, jd_content: str) -> Tuple[str, str]
     }}
     """
     
-    def _extract_info(model: Any, prompt_text: str) -> Tuple[str, str]:
-        try:
-            print("Extracting company and position from job description...")
-            response = model.generate_content(prompt_text)
+    async def _extract_info(model: Any, jd_content: str) -> Tuple[str, str]:
+        print("Extracting company and position from job description...")
+        prompt_text = _build_prompt(jd_content)
+        cache_key = response_cache_key(model, prompt_text)
+        response_text = load_cached_response(cache_key)
+        if response_text is None:
+            # Cache-backed models may already hold the job description
+            model = await resolve_model(model)
+            if "Job Description" in cached_documents(model):
+                prompt_text = _build_prompt(None)
+            await acquire_rate_limit(model, prompt_text)
+            response = await model.generate_content_async(prompt_text)
             
             # Check if response is None or empty
             if response is None or not hasattr(response, 'text') or not response.text:
                 print("Warning: Empty or invalid response from Gemini API")
                 return "Unknown Company", "Unknown Position"
-                
-            result_text = response.text.strip()
-            
-            # Print the raw response for diagnostic purposes
-            print("\nDiagnostic - Raw response from Gemini:")
-            print(f"---\n{result_text}\n---")
+            response_text = response.text
             
-            # Parsing approach 1: Extract JSON from code blocks
-            extracted_info = None
-            
-            # Method 1: Try to extract JSON from code blocks
-            if "```" in result_text:
-                try:
-                    match = re.search(r"```(?:json)?(.+?)```", result_text, re.DOTALL)
-                    if match:
-                        json_text = match.group(1).strip()
-                        print(f"Extracted JSON from code blocks: {json_text}")
-                        extracted_info = json.loads(json_text)
-                except (json.JSONDecodeError, AttributeError) as e:
-                    print(f"Failed to parse JSON from code blocks: {str(e)}")
-            
-            # Method 2: If method 1 failed, try to find JSON-like structure with regex
-            if not extracted_info:
-                try:
-                    # Look for JSON-like pattern with braces
-                    json_pattern = r"\{[^{}]*\"company\"[^{}]*\"position\"[^{}]*\}"
-                    match = re.search(json_pattern, result_text, re.DOTALL)
-                    if match:
-                        json_text = match.group(0).strip()
-                        print(f"Extracted JSON using regex pattern: {json_text}")
-                        extracted_info = json.loads(json_text)
-                except (json.JSONDecodeError, AttributeError) as e:
-                    print(f"Failed to parse JSON using regex pattern: {str(e)}")
-            
-            # Method 3: Try parsing the whole response as JSON after cleaning
-            if not extracted_info:
-                try:
-                    # Clean the text - remove backticks, extra spaces, etc.
-                    cleaned_text = result_text.replace("```", "").replace("json", "").strip()
-                    print(f"Attempting to parse cleaned text as JSON: {cleaned_text}")
-                    extracted_info = json.loads(cleaned_text)
-                except json.JSONDecodeError as e:
-                    print(f"Failed to parse cleaned text as JSON: {str(e)}")
-            
-            # If we successfully parsed the JSON, extract the company and position
-            if extracted_info:
-                company = extracted_info.get("company", "Unknown Company")
-                position = extracted_info.get("position", "Unknown Position")
-                
-                print(f"Extracted Company: {company}")
-                print(f"Extracted Position: {position}")
-                
-                return company, position
-            
-            # Fallback: Try to extract company and position directly with regex
-            print("Falling back to regex extraction...")
-            
-            # Initialize default values
-            company = "Unknown Company"
-            position = "Unknown Position"
-            
-            # Try to find company name with common patterns
-            company_match = re.search(r"company\"?\s*:\s*\"([^\"]+)\"", result_text, re.IGNORECASE)
-            if company_match:
-                company = company_match.group(1)
+        result_text = response_text.strip()
+        
+        # Log the raw response for diagnostic purposes
+        logger.debug("Raw extraction response from Gemini:\n---\n%s\n---", result_text)
+        
+        # Decode the first JSON object in the response, ignoring any surrounding text. If the
+        # JSON is inside a code block, start searching there, using offsets rather than slices
+        extracted_info = None
+        fence = _FENCE_RE.search(result_text)
+        start = result_text.find("{", fence.start(1) if fence else 0)
+        if start >= 0:
+            try:
+                extracted_info, _ = _JSON_DECODER.raw_decode(result_text, start)
+            except json.JSONDecodeError as e:
+                logger.debug("Failed to parse JSON from response: %s", e)
+        
+        # If we successfully parsed the JSON, extract the company and position
+        if extracted_info:
+            company = extracted_info.get("company", "Unknown Company")
+            position = extracted_info.get("position", "Unknown Position")
             
-            # Try to find position with common patterns
-            position_match = re.search(r"position\"?\s*:\s*\"([^\"]+)\"", result_text, re.IGNORECASE)
-            if position_match:
-                position = position_match.group(1)
+            print(f"Extracted Company: {company}")
+            print(f"Extracted Position: {position}")
             
-            print(f"Extracted via regex - Company: {company}, Position: {position}")
+            store_cached_response(cache_key, model, response_text)
             return company, position
-            
-        except Exception as e:
-            if "429 Resource has been exhausted" in str(e) or "quota" in str(e).lower():
-                # Let this be caught by the retry mechanism
-                raise e
-            else:
-                print(f"Error extracting from response: {str(e)}")
-                return "Unknown Company", "Unknown Position"
+        
+        # Fallback: Try to extract company and position directly with regex
+        logger.debug("Falling back to regex extraction...")
+        
+        # Initialize default values
+        company = "Unknown Company"
+        position = "Unknown Position"
+        
+        # Try to find company name with common patterns
+        company_match = _COMPANY_RE.search(result_text)
+        if company_match:
+            company = company_match.group(1)
+        
+        # Try to find position with common patterns
+        position_match = _POSITION_RE.search(result_text)
+        if position_match:
+            position = position_match.group(1)
+        
+        logger.debug("Extracted via regex - Company: %s, Position: %s", company, position)
+        return company, position
     
     try:
-        return retry_with_models(_extract_info, model, prompt)
+        return await retry_with_models_async(_extract_info, model, jd_content)
     except Exception as e:
         print(f"Error extracting company and position: {str(e)}")
         print(f"Exception type: {type(e).__name__}")
         
-        # Print stack trace for better diagnostics
-        import traceback
-        # Print stack trace for better diagnostics
-        import traceback
-        print("Stack trace:")
-        traceback.print_exc()
+        # Log stack trace for better diagnostics
+        logger.debug("Stack trace:", exc_info=True)
 
         return "Unknown Company", "Unknown Position"
 def save_tailored_resume(content: str, output_path: str) -> None:
     """Save the tailored resume content to the specified file."""
     try:
-        with open(output_path, 'w', encoding='utf-8') as file:
-            file.write(content)
+        # Encode once and write the whole file in a single call
+        Path(output_path).write_bytes(content.encode('utf-8'))
         print(f"Tailored resume successfully saved to: {output_path}")
     except Exception as e:
         print(f"Error saving tailored resume: {str(e)}")
         sys.exit(1)
 
 
+async def tailor_resume(model: Any, resume_content: str, jd_content: str,
+                        company: Optional[str], position: Optional[str],
+                        split_model: Optional[Any] = None) -> Tuple[str, str, str]:
+    """
+    Tailor a resume to a job description, extracting company/position if needed.
+
+    Args:
+        model: The Gemini AI model to use
+        resume_content: The original LaTeX resume content
+        jd_content: The job description text
+        company: Company name supplied by the user, or None to extract it
+        position: Position name supplied by the user, or None to extract it
+        split_model: The model for the separate extraction and tailoring requests sent
+            if the bundled request fails, or None to use model
+
+    Returns:
+        A tuple of (company, position, tailored_content); the tailored content is
+        the original resume if tailoring fails
+    """
+    tailored_content = None
+    if split_model is None:
+        split_model = model
+
+    # Extract company/position (if not provided) and tailor the resume in a single request
+    print("Generating tailored content from job description...")
+    bundle = await generate_tailored_bundle(model, resume_content, jd_content, company, position)
+    if bundle is not None:
+        company, position, tailored_content = bundle
+    else:
+        print("Bundled request failed. Falling back to separate extraction and tailoring requests...")
+
+        # Use provided company/position or try to extract them
+        if company is None or position is None:
+            try:
+                print("Attempting to extract company and position from job description...")
+                extracted_company, extracted_position = await extract_company_and_position(split_model, jd_content)
+
+                # Use extracted values only when not provided via command line
+                if company is None:
+                    company = extracted_company
+                if position is None:
+                    position = extracted_position
+
+                # Check if extraction was meaningful
+                if company == "Unknown Company" and position == "Unknown Position":
+                    print("Warning: Failed to extract meaningful company and position information")
+            except Exception as e:
+                print(f"Error during extraction: {str(e)}")
+
+    # Ensure we have defaults even if extraction completely failed
+    if company is None:
+        company = "Unknown Company"
+        print(f"Using default company name: {company}")
+    if position is None:
+        position = "Unknown Position"
+        print(f"Using default position name: {position}")
+
+    print(f"Processing resume for {position} at {company}")
+
+    # Generate tailored resume separately only if the bundled request failed
+    try:
+        if tailored_content is None:
+            print(f"Generating tailored content for {position} at {company}...")
+            tailored_content = await generate_tailored_content(
+                split_model, resume_content, jd_content, company, position
+            )
+        if not tailored_content or tailored_content == resume_content:
+            print("Warning: Generated content is empty or unchanged. Using original resume as fallback.")
+            tailored_content = resume_content
+    except Exception as e:
+        print(f"Error generating tailored content: {str(e)}")
+        print("Using original resume as fallback.")
+        tailored_content = resume_content
+
+    return company, position, tailored_content
+
+
+def load_cached_model(model: Any, context_cache: Optional[Any]) -> Any:
+    """
+    Build a model backed by a context cache.
+
+    Args:
+        model: The loaded Gemini AI model, used if the cache cannot be loaded
+        context_cache: The CachedContent object, or None
+
+    Returns:
+        The cache-backed model, or the given model if there is no usable cache
+    """
+    if context_cache is None:
+        return model
+    try:
+        return genai.GenerativeModel.from_cached_content(cached_content=context_cache)
+    except Exception as e:
+        print(f"Warning: Could not load model from context cache, sending full prompts instead: {str(e)}")
+        return model
+
+
+class LazyContextCache:
+    """
+    A context cache that is only created when the first request misses the response cache.
+
+    Passed in place of a model; resolve_model() turns it into the cache-backed model,
+    so runs answered entirely from the response cache make no caching API calls.
+    """
+
+    def __init__(self, model: Any, model_name: str, jd_content: Optional[str], resume_content: str,
+                 ttl_seconds: int = 600):
+        self.model_name = getattr(model, "model_name", model_name)
+        self._model = model
+        self._cache_args = (model_name, jd_content, resume_content, ttl_seconds)
+        self._creating: Optional[asyncio.Future] = None
+        self._resolved: Optional[Any] = None
+
+    async def resolve(self) -> Any:
+        """Create the context cache on first use and return the model to send requests with."""
+        if self._creating is None:
+            self._creating = asyncio.ensure_future(asyncio.to_thread(build_context_cache, *self._cache_args))
+        # Shielded so a request cancelled mid-creation (e.g. one that lost a model race) can't leak the cache
+        cache = await asyncio.shield(self._creating)
+        if self._resolved is None:
+            self._resolved = load_cached_model(self._model, cache)
+        return self._resolved
+
+    async def close(self) -> None:
+        """Delete the context cache, if one was created."""
+        if self._creating is None:
+            return
+        cache = await self._creating
+        self._creating = None
+        if cache is not None:
+            await asyncio.to_thread(delete_context_cache, cache)
+
+
+async def resolve_model(model: Any) -> Any:
+    """Return the model to send a request with, creating a pending context cache if needed."""
+    if isinstance(model, LazyContextCache):
+        return await model.resolve()
+    return model
+
+
+async def tailor_job(model: Any, model_name: str, resume_content: str, jd_content: str,
+                     company: Optional[str], position: Optional[str]) -> Tuple[str, str, str]:
+    """
+    Tailor the resume for one job description, using a context cache when it pays off.
+
+    The bundled request sends the job description and resume only once, so it goes
+    straight to the model. Only if it fails do the separate extraction and tailoring
+    requests share a context cache holding both documents.
+
+    Args:
+        model: The loaded Gemini AI model, or the shared resume cache of a batch
+        model_name: The name of the loaded model, used to create the context cache
+        resume_content: The original LaTeX resume content
+        jd_content: The job description text
+        company: Company name supplied by the user, or None to extract it
+        position: Position name supplied by the user, or None to extract it
+
+    Returns:
+        A tuple of (company, position, tailored_content), as returned by tailor_resume
+    """
+    # A shared resume cache from tailor_batch already covers the bulk of the prompt
+    if isinstance(model, LazyContextCache):
+        return await tailor_resume(model, resume_content, jd_content, company, position)
+
+    # Created only if a fallback request misses the response cache
+    context_cache = LazyContextCache(model, model_name, jd_content, resume_content)
+    try:
+        return await tailor_resume(model, resume_content, jd_content, company, position,
+                                   split_model=context_cache)
+    finally:
+        await context_cache.close()
+
+
+async def tailor_batch(model: Any, model_name: str, resume_content: str, jd_paths: List[Path],
+                       output_dir: Path, concurrency: int) -> List[str]:
+    """
+    Tailor the resume for several job descriptions concurrently.
+
+    The resume is uploaded once as a context cache shared by every job, so each
+    request only sends its job description. Each tailored resume is saved to
+    output_dir as <job description name>.tex. A job description that cannot be
+    read, or whose result cannot be saved, is reported and skipped without
+    stopping the other jobs.
+
+    Args:
+        model: The loaded Gemini AI model
+        model_name: The name of the loaded model, used to create context caches
+        resume_content: The original LaTeX resume content
+        jd_paths: Paths of the job description files
+        output_dir: Directory for the tailored resumes
+        concurrency: Maximum number of job descriptions processed at once
+
+    Returns:
+        The names of the job description files that were skipped
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    resume_cache = LazyContextCache(model, model_name, None, resume_content, RESUME_CACHE_TTL_SECONDS)
+    skipped: List[str] = []
+
+    async def _tailor_one(jd_path: Path) -> None:
+        async with semaphore:
+            # Each job runs in its own task, so the label only applies to its requests
+            _JOB_LABEL.set(jd_path.name)
+            print(f"Tailoring resume for job description {jd_path.name}...")
+            # read_file and save_tailored_resume exit on error, which would abort every other job
+            try:
+                jd_content = jd_path.read_bytes().decode('utf-8')
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error reading job description {jd_path}, skipping it: {str(e)}")
+                skipped.append(jd_path.name)
+                return
+
+            job_company, job_position, tailored_content = await tailor_job(
+                resume_cache, model_name, resume_content, jd_content, None, None
+            )
+
+            output_path = output_dir / f"{jd_path.stem}.tex"
+            try:
+                output_path.write_bytes(
+                    add_header_comment(tailored_content, job_company, job_position).encode('utf-8')
+                )
+            except OSError as e:
+                print(f"Error saving tailored resume to {output_path}, skipping it: {str(e)}")
+                skipped.append(jd_path.name)
+                return
+            print(f"Tailored resume successfully saved to: {output_path}")
+
+    try:
+        await asyncio.gather(*(_tailor_one(jd_path) for jd_path in jd_paths))
+        return skipped
+    finally:
+        await resume_cache.close()
+
+
+def add_header_comment(content: str, company: str, position: str) -> str:
+    """Prefix the tailored resume with a comment header for reference."""
+    header_comment = f"% Tailored resume for {company} - {position}\n"
+    header_comment += f"% Auto-tailored using Gemini AI on {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    return header_comment + content
+
+
 def main() -> None:
     """Main function to orchestrate the resume tailoring process."""
     args = parse_arguments()
+
+    # Diagnostics are only logged when DEBUG is set
+    if DEBUG:
+        logging.basicConfig(format="%(levelname)s %(name)s: %(message)s")
+        logger.setLevel(logging.DEBUG)
     
     # Get API key from environment variable
     api_key = os.environ.get("GEMINI_API_KEY")
@@ -558,70 +1440,38 @@ def main() -> None:
 
     # Load the model
     try:
-        model = genai.GenerativeModel(selected_model)
+        model = get_model(selected_model)
         print(f"Gemini model '{selected_model}' loaded successfully.")
     except Exception as e:
         print(f"Error loading Gemini model: {str(e)}")
         sys.exit(1)
     
-    # Read input files
+    # Reuse responses from previous runs with the same model and prompt
+    if not args.no_cache:
+        open_response_cache()
+
+    # Read the template once; it is shared by every job description
     resume_content = read_file(args.template)
-    jd_content = read_file(args.jd)
-    
-    # Extract company and position from job description if not provided
-    company = args.company
-    position = args.position
-    
-    # Use provided company/position or try to extract them
-    extraction_success = True
-    if company is None or position is None:
-        try:
-            print("Attempting to extract company and position from job description...")
-            extracted_company, extracted_position = extract_company_and_position(model, jd_content)
-            
-            # Use extracted values only when not provided via command line
-            if company is None:
-                company = extracted_company
-            if position is None:
-                position = extracted_position
-                
-            # Check if extraction was meaningful
-            if company == "Unknown Company" and position == "Unknown Position":
-                print("Warning: Failed to extract meaningful company and position information")
-                extraction_success = False
-        except Exception as e:
-            print(f"Error during extraction: {str(e)}")
-            extraction_success = False
-            
-    # Ensure we have defaults even if extraction completely failed
-    if company is None:
-        company = "Unknown Company"
-        print(f"Using default company name: {company}")
-    if position is None:
-        position = "Unknown Position"
-        print(f"Using default position name: {position}")
-    
-    print(f"Processing resume for {position} at {company}")
-    
-    # Generate tailored resume using Gemini AI
-    try:
-        print(f"Generating tailored content for {position} at {company}...")
-        tailored_content = generate_tailored_content(
-            model, resume_content, jd_content, company, position
-        )
-        if not tailored_content or tailored_content == resume_content:
-            print("Warning: Generated content is empty or unchanged. Using original resume as fallback.")
-            tailored_content = resume_content
-    except Exception as e:
-        print(f"Error generating tailored content: {str(e)}")
-        print("Using original resume as fallback.")
-        tailored_content = resume_content
-    # Add a comment header for reference
-    header_comment = f"% Tailored resume for {company} - {position}\n"
-    header_comment += f"% Auto-tailored using Gemini AI on {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-    
-    # Save the tailored resume
-    save_tailored_resume(header_comment + tailored_content, args.output)
+
+    if args.jd_dir:
+        # Tailor the resume for every job description in the directory concurrently
+        jd_paths = sorted(Path(args.jd_dir).glob("*.txt"))
+        if not jd_paths:
+            print(f"Error: No job description (.txt) files found in {args.jd_dir}")
+            sys.exit(1)
+        skipped = get_event_loop().run_until_complete(tailor_batch(
+            model, selected_model, resume_content, jd_paths, Path(args.output), args.concurrency
+        ))
+        if skipped:
+            print(f"Error: Could not tailor the resume for {len(skipped)} of {len(jd_paths)} "
+                  f"job descriptions: {', '.join(sorted(skipped))}")
+            sys.exit(1)
+    else:
+        jd_content = read_file(args.jd)
+        company, position, tailored_content = get_event_loop().run_until_complete(tailor_job(
+            model, selected_model, resume_content, jd_content, args.company, args.position
+        ))
+        save_tailored_resume(add_header_comment(tailored_content, company, position), args.output)
     
     print("Resume tailoring completed successfully.")
 